@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import threading
+import typing
+from concurrent.futures import Future
+
+if typing.TYPE_CHECKING:
+    from flagsmith.flagsmith import Flagsmith
+    from flagsmith.models import Flags
+
+
+class IdentityRequest(typing.NamedTuple):
+    identifier: str
+    traits: typing.Dict[str, typing.Any]
+
+
+BulkIdentityFetcher = typing.Callable[
+    ["Flagsmith", typing.Sequence[IdentityRequest]],
+    typing.Sequence[typing.Union["Flags", BaseException]],
+]
+
+
+class _Batch:
+    def __init__(self) -> None:
+        self.requests: typing.List[IdentityRequest] = []
+        self.futures: typing.List[Future] = []
+        self.full = threading.Event()
+
+    def add(self, request: IdentityRequest) -> Future:
+        # Concurrent requests for the same identity and traits share a fetch.
+        for i, pending in enumerate(self.requests):
+            if pending == request:
+                return self.futures[i]
+        future: Future = Future()
+        self.requests.append(request)
+        self.futures.append(future)
+        return future
+
+    def remove(self, future: Future) -> None:
+        i = self.futures.index(future)
+        del self.requests[i], self.futures[i]
+
+
+class IdentityFlagsBatcher:
+    """
+    Collects concurrent identity flag requests into batches.
+
+    With a ``fetch`` callable, the first caller to arrive waits up to
+    ``max_wait_seconds`` (or until the batch holds ``max_batch_size``
+    identities) and then fetches the batch with a single call on behalf of
+    every caller in it, for example to a bulk identities endpoint.
+
+    Without one, nothing is batched: each caller fetches its own identity
+    straight away with ``get_identity_flags``, and concurrent callers for the
+    same identity and traits wait for that fetch instead of repeating it.
+
+    Requests are kept per client, so one batcher can be shared by several
+    providers. The batcher holds no threads or connections of its own and is
+    not closed by the providers using it.
+    """
+
+    def __init__(
+        self,
+        fetch: typing.Optional[BulkIdentityFetcher] = None,
+        max_wait_seconds: float = 0.002,
+        max_batch_size: int = 100,
+    ):
+        """
+        :param fetch: callable taking a client and a sequence of identity
+            requests, returning for each request, in the same order, either
+            its flags or the exception raised fetching them
+        :param max_wait_seconds: how long to collect requests before calling
+            ``fetch``
+        :param max_batch_size: call ``fetch`` as soon as a batch holds this
+            many distinct identities
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be a positive integer.")
+        self.fetch = fetch
+        self.max_wait_seconds = max_wait_seconds
+        self.max_batch_size = max_batch_size
+        # Pending batches, or without ``fetch`` the requests being fetched,
+        # keyed by client.
+        self._batches: typing.Dict[int, _Batch] = {}
+        self._lock = threading.Lock()
+
+    def get_identity_flags(
+        self,
+        client: Flagsmith,
+        identifier: str,
+        traits: typing.Dict[str, typing.Any],
+    ) -> Flags:
+        if self.fetch is None:
+            return self._get_identity_flags_once(client, identifier, traits)
+
+        key = id(client)
+        with self._lock:
+            batch = self._batches.get(key)
+            is_leader = batch is None
+            if batch is None:
+                batch = self._batches[key] = _Batch()
+            future = batch.add(IdentityRequest(identifier, traits))
+            if len(batch.requests) >= self.max_batch_size:
+                del self._batches[key]
+                batch.full.set()
+
+        if is_leader:
+            batch.full.wait(self.max_wait_seconds)
+            with self._lock:
+                if self._batches.get(key) is batch:
+                    del self._batches[key]
+            self._dispatch(self.fetch, client, batch)
+
+        return future.result()
+
+    def _get_identity_flags_once(
+        self,
+        client: Flagsmith,
+        identifier: str,
+        traits: typing.Dict[str, typing.Any],
+    ) -> Flags:
+        key = id(client)
+        request = IdentityRequest(identifier, traits)
+        with self._lock:
+            in_flight = self._batches.get(key)
+            if in_flight is None:
+                in_flight = self._batches[key] = _Batch()
+            is_owner = request not in in_flight.requests
+            future = in_flight.add(request)
+
+        if not is_owner:
+            return future.result()
+
+        try:
+            flags = client.get_identity_flags(identifier=identifier, traits=traits)
+        except BaseException as e:
+            self._finish(key, in_flight, future)
+            future.set_exception(e)
+            raise
+        self._finish(key, in_flight, future)
+        future.set_result(flags)
+        return flags
+
+    def _finish(self, key: int, in_flight: _Batch, future: Future) -> None:
+        with self._lock:
+            in_flight.remove(future)
+            if not in_flight.requests and self._batches.get(key) is in_flight:
+                del self._batches[key]
+
+    @staticmethod
+    def _dispatch(fetch: BulkIdentityFetcher, client: Flagsmith, batch: _Batch) -> None:
+        try:
+            results = fetch(client, batch.requests)
+            if len(results) != len(batch.requests):
+                raise ValueError(
+                    "Bulk identity fetch returned %d results for %d identities."
+                    % (len(results), len(batch.requests))
+                )
+        except BaseException as e:
+            for future in batch.futures:
+                future.set_exception(e)
+            return
+
+        for future, result in zip(batch.futures, results):
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
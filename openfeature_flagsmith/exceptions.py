@@ -1,4 +1,4 @@
-from openfeature.exception import OpenFeatureError, ProviderFatalError
+from openfeature.exception import ErrorCode, OpenFeatureError, ProviderFatalError
 
 
 class FlagsmithProviderError(OpenFeatureError):
@@ -11,3 +11,12 @@ class FlagsmithConfigurationError(ProviderFatalError):
     """
 
     pass
+
+
+class FlagsmithTokenError(FlagsmithProviderError):
+    """
+    This exception should be raised when a flags token cannot be decoded or fails signature verification
+    """
+
+    def __init__(self, error_message: str):
+        super().__init__(error_code=ErrorCode.GENERAL, error_message=error_message)
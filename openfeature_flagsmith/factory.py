@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import threading
+import typing
+
+from flagsmith.flagsmith import Flagsmith
+from requests.adapters import HTTPAdapter
+from urllib3 import Retry
+
+from openfeature_flagsmith.provider import FlagsmithProvider
+
+
+class ConnectionPoolStats(typing.NamedTuple):
+    """
+    Usage of the connection pool for a single host.
+
+    ``in_use`` counts connections currently checked out for a request, and
+    ``idle`` counts open connections kept alive for reuse.
+    """
+
+    scheme: str
+    host: str
+    port: typing.Optional[int]
+    max_size: int
+    in_use: int
+    idle: int
+    connections_created: int
+    requests: int
+
+
+class FlagsmithProviderFactory:
+    """
+    Builds Flagsmith clients and providers that share one set of HTTP
+    connection pools.
+
+    Each Flagsmith client keeps its own session, since the environment key is
+    sent as a session header, but requests to the Flagsmith API are routed
+    through a single shared adapter. Clients for different environments on
+    the same API host therefore reuse the same kept-alive connections rather
+    than opening a pool (and TLS handshake) each.
+
+    Note that a client created with ``enable_local_evaluation=True`` fetches
+    its first environment document while it is constructed, before it can be
+    attached to the shared pools.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        retries: typing.Optional[Retry] = None,
+        keep_alive: bool = True,
+    ):
+        """
+        :param pool_connections: number of hosts to keep connection pools for
+        :param pool_maxsize: maximum number of connections kept per host
+        :param pool_block: if True, requests wait for a free connection when a
+            host's pool is exhausted rather than opening an extra one
+        :param retries: a urllib3.Retry object to use on all requests to the
+            Flagsmith API
+        :param keep_alive: if False, connections are closed after each request
+        """
+        self.keep_alive = keep_alive
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            max_retries=retries or Retry(total=3, backoff_factor=0.1),
+        )
+        self._clients: typing.List[Flagsmith] = []
+        self._lock = threading.Lock()
+
+    @property
+    def clients(self) -> typing.List[Flagsmith]:
+        with self._lock:
+            return list(self._clients)
+
+    def create_client(self, environment_key: str, **kwargs: typing.Any) -> Flagsmith:
+        """
+        Creates a Flagsmith client using the shared connection pools.
+
+        :param environment_key: the environment key for the client
+        :param kwargs: any other arguments accepted by ``Flagsmith``, except
+            ``retries``, which is configured on the factory
+        """
+        if "retries" in kwargs:
+            raise ValueError("retries must be configured on the factory.")
+
+        client = Flagsmith(environment_key=environment_key, **kwargs)
+        if not client.offline_mode:
+            session = client.session
+            if own_adapter := session.adapters.get(client.api_url):
+                own_adapter.close()
+            session.mount(client.api_url, self._adapter)
+            if not self.keep_alive:
+                session.headers["Connection"] = "close"
+
+        with self._lock:
+            self._clients.append(client)
+        return client
+
+    def create_provider(
+        self,
+        environment_key: str,
+        client_kwargs: typing.Optional[typing.Dict[str, typing.Any]] = None,
+        **provider_kwargs: typing.Any,
+    ) -> FlagsmithProvider:
+        """
+        Creates a FlagsmithProvider backed by a client from ``create_client``.
+
+        :param environment_key: the environment key for the client
+        :param client_kwargs: other arguments for ``create_client``
+        :param provider_kwargs: arguments for ``FlagsmithProvider``
+        """
+        return FlagsmithProvider(
+            self.create_client(environment_key, **(client_kwargs or {})),
+            **provider_kwargs,
+        )
+
+    def pool_stats(self) -> typing.List[ConnectionPoolStats]:
+        """
+        Returns the usage of the shared connection pool for each host.
+        """
+        pools = self._adapter.poolmanager.pools
+        stats = []
+        for key in pools.keys():
+            if (pool := pools.get(key)) is None:
+                continue
+            slots = pool.pool
+            if slots is None:  # closed
+                continue
+            idle = sum(1 for conn in list(slots.queue) if conn is not None)
+            stats.append(
+                ConnectionPoolStats(
+                    scheme=pool.scheme,
+                    host=pool.host,
+                    port=pool.port,
+                    max_size=slots.maxsize,
+                    in_use=slots.maxsize - slots.qsize(),
+                    idle=idle,
+                    connections_created=pool.num_connections,
+                    requests=pool.num_requests,
+                )
+            )
+        return stats
+
+    def release_client(self, client: Flagsmith) -> None:
+        """
+        Stops the background threads of a client created by the factory and
+        stops tracking it. Its pooled connections remain available to others.
+        """
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+        self._stop_client(client)
+
+    def close(self) -> None:
+        """
+        Stops the background threads of every client created by the factory
+        and closes all pooled connections.
+        """
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            self._stop_client(client)
+        self._adapter.close()
+
+    @staticmethod
+    def _stop_client(client: Flagsmith) -> None:
+        for thread_attr in (
+            "environment_data_polling_manager_thread",
+            "event_stream_thread",
+        ):
+            if thread := getattr(client, thread_attr, None):
+                thread.stop()
+        # Started by clients with pipeline analytics configured, under either
+        # name depending on the flagsmith version.
+        for processor_attr in ("_event_processor", "_pipeline_analytics_processor"):
+            if processor := getattr(client, processor_attr, None):
+                processor.stop()
@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import itertools
+import logging
+import threading
+import time
+import typing
+import weakref
+
+from openfeature.exception import ErrorCode
+
+SOURCE_CACHE = "cache"
+SOURCE_FETCH = "fetch"
+SOURCE_TOKEN = "token"
+
+
+class FlagEvaluationStats:
+    """
+    Counters collected for a single flag key.
+
+    Every evaluation is counted, but only sampled evaluations are timed, so
+    ``estimated_total_time_ns`` extrapolates the mean sampled duration across
+    all evaluations.
+    """
+
+    __slots__ = (
+        "flag_key",
+        "evaluations",
+        "sampled_evaluations",
+        "sampled_time_ns",
+        "errors",
+        "sources",
+    )
+
+    def __init__(self, flag_key: str):
+        self.flag_key = flag_key
+        self.evaluations = 0
+        self.sampled_evaluations = 0
+        self.sampled_time_ns = 0
+        self.errors: typing.Dict[ErrorCode, int] = {}
+        self.sources: typing.Dict[str, int] = {}
+
+    @property
+    def error_count(self) -> int:
+        return sum(self.errors.values())
+
+    @property
+    def mean_time_ns(self) -> typing.Optional[float]:
+        if not self.sampled_evaluations:
+            return None
+        return self.sampled_time_ns / self.sampled_evaluations
+
+    @property
+    def estimated_total_time_ns(self) -> float:
+        return (self.mean_time_ns or 0.0) * self.evaluations
+
+    def _copy(self) -> FlagEvaluationStats:
+        copy = FlagEvaluationStats(self.flag_key)
+        copy.evaluations = self.evaluations
+        copy.sampled_evaluations = self.sampled_evaluations
+        copy.sampled_time_ns = self.sampled_time_ns
+        copy.errors = dict(self.errors)
+        copy.sources = dict(self.sources)
+        return copy
+
+    def _merge(self, other: FlagEvaluationStats) -> None:
+        self.evaluations += other.evaluations
+        self.sampled_evaluations += other.sampled_evaluations
+        self.sampled_time_ns += other.sampled_time_ns
+        for error_code, count in dict(other.errors).items():
+            self.errors[error_code] = self.errors.get(error_code, 0) + count
+        for source, count in dict(other.sources).items():
+            self.sources[source] = self.sources.get(source, 0) + count
+
+    def __repr__(self) -> str:
+        return (
+            f"FlagEvaluationStats(flag_key={self.flag_key!r}, "
+            f"evaluations={self.evaluations}, errors={self.errors!r}, "
+            f"sources={self.sources!r}, mean_time_ns={self.mean_time_ns!r})"
+        )
+
+
+class EvaluationProfiler:
+    """
+    Opt-in per-flag evaluation counters for ``FlagsmithProvider``.
+
+    Only one in every ``sample_rate`` evaluations is timed, which keeps the
+    overhead bounded on hot paths. Each thread records into its own set of
+    counters without locking, and ``report`` merges them. The counters of a
+    thread that has exited are folded into a shared total, so short-lived
+    threads do not accumulate.
+    """
+
+    def __init__(self, sample_rate: int = 100, report_top_k: int = 10):
+        """
+        :param sample_rate: time one in every ``sample_rate`` evaluations
+        :param report_top_k: number of flags included in the report logged
+            when the provider is shut down
+        """
+        if sample_rate < 1:
+            raise ValueError("sample_rate must be a positive integer.")
+        self.sample_rate = sample_rate
+        self.report_top_k = report_top_k
+        # One dict of counters per live thread, keyed by its id; only the
+        # owning thread writes to it. The lock guards the shards and the
+        # retired counters, not the live counters.
+        self._shards: typing.Dict[int, typing.Dict[str, FlagEvaluationStats]] = {}
+        self._retired: typing.Dict[str, FlagEvaluationStats] = {}
+        self._generation = 0
+        self._local = threading.local()
+        # Reentrant, since a shard may be retired by a garbage collection
+        # triggered while the lock is held.
+        self._lock = threading.RLock()
+        self._calls = itertools.count()
+
+    def start(self) -> typing.Optional[int]:
+        """
+        Called before an evaluation. Returns a start timestamp if this
+        evaluation is sampled, otherwise None.
+        """
+        if next(self._calls) % self.sample_rate:
+            return None
+        return time.perf_counter_ns()
+
+    def record(
+        self,
+        flag_key: str,
+        source: str,
+        started_at: typing.Optional[int],
+        error_code: typing.Optional[ErrorCode] = None,
+    ) -> None:
+        """
+        Called after an evaluation with the value returned by ``start``.
+        """
+        shard = self._shard()
+        stats = shard.get(flag_key)
+        if stats is None:
+            stats = shard[flag_key] = FlagEvaluationStats(flag_key)
+        stats.evaluations += 1
+        stats.sources[source] = stats.sources.get(source, 0) + 1
+        if error_code is not None:
+            stats.errors[error_code] = stats.errors.get(error_code, 0) + 1
+        if started_at is not None:
+            stats.sampled_time_ns += time.perf_counter_ns() - started_at
+            stats.sampled_evaluations += 1
+
+    def report(
+        self, top_k: typing.Optional[int] = None
+    ) -> typing.List[FlagEvaluationStats]:
+        """
+        Returns a copy of the counters for the ``top_k`` flags with the
+        highest estimated total evaluation time, ties broken by evaluation
+        count. Returns every flag if ``top_k`` is None.
+        """
+        with self._lock:
+            merged = {
+                flag_key: retired_stats._copy()
+                for flag_key, retired_stats in self._retired.items()
+            }
+            shards = list(self._shards.values())
+
+        for shard in shards:
+            for flag_key, shard_stats in list(shard.items()):
+                if (flag_stats := merged.get(flag_key)) is None:
+                    merged[flag_key] = shard_stats._copy()
+                else:
+                    flag_stats._merge(shard_stats)
+
+        stats = list(merged.values())
+        stats.sort(
+            key=lambda s: (s.estimated_total_time_ns, s.evaluations), reverse=True
+        )
+        return stats if top_k is None else stats[:top_k]
+
+    def format_report(self, top_k: typing.Optional[int] = None) -> str:
+        rows = [
+            "%-40s %12s %12s %14s %8s  %s"
+            % (
+                "flag",
+                "evaluations",
+                "mean (us)",
+                "est. total (ms)",
+                "errors",
+                "sources",
+            )
+        ]
+        for stats in self.report(top_k):
+            mean_time_ns = stats.mean_time_ns
+            rows.append(
+                "%-40s %12d %12s %14.3f %8d  %s"
+                % (
+                    stats.flag_key,
+                    stats.evaluations,
+                    "-" if mean_time_ns is None else "%.1f" % (mean_time_ns / 1e3),
+                    stats.estimated_total_time_ns / 1e6,
+                    stats.error_count,
+                    ", ".join("%s=%d" % item for item in sorted(stats.sources.items())),
+                )
+            )
+        return "\n".join(rows)
+
+    def log_report(self, logger: logging.Logger) -> None:
+        """
+        Logs the report for the top ``report_top_k`` flags at ``INFO`` level.
+        """
+        logger.info(
+            "Flag evaluation profile (top %d):\n%s",
+            self.report_top_k,
+            self.format_report(self.report_top_k),
+        )
+
+    def reset(self) -> None:
+        with self._lock:
+            # Threads notice the new generation and start a fresh shard.
+            self._shards = {}
+            self._retired = {}
+            self._generation += 1
+
+    def _shard(self) -> typing.Dict[str, FlagEvaluationStats]:
+        local = self._local
+        if getattr(local, "generation", None) != self._generation:
+            shard: typing.Dict[str, FlagEvaluationStats] = {}
+            with self._lock:
+                generation = self._generation
+                self._shards[id(shard)] = shard
+            # The owner lives only in this thread's local storage, so it is
+            # collected when the thread exits, retiring the shard.
+            owner = _ShardOwner()
+            weakref.finalize(
+                owner, _retire_shard, weakref.ref(self), shard, generation
+            ).atexit = False
+            # Replacing a previous generation's owner retires its shard, so
+            # this is done without holding the lock.
+            local.shard, local.generation, local.owner = shard, generation, owner
+        return local.shard
+
+    def _retire(
+        self, shard: typing.Dict[str, FlagEvaluationStats], generation: int
+    ) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            del self._shards[id(shard)]
+            for flag_key, shard_stats in shard.items():
+                if (retired_stats := self._retired.get(flag_key)) is None:
+                    self._retired[flag_key] = shard_stats
+                else:
+                    retired_stats._merge(shard_stats)
+
+
+class _ShardOwner:
+    __slots__ = ("__weakref__",)
+
+
+def _retire_shard(
+    profiler_ref: weakref.ReferenceType[EvaluationProfiler],
+    shard: typing.Dict[str, FlagEvaluationStats],
+    generation: int,
+) -> None:
+    if (profiler := profiler_ref()) is not None:
+        profiler._retire(shard, generation)
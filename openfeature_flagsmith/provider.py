@@ -1,13 +1,16 @@
-import json
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import logging
+import threading
 import typing
-from json import JSONDecodeError
 
-from flagsmith.exceptions import FlagsmithClientError
-from flagsmith.flagsmith import Flagsmith
 from openfeature.evaluation_context import EvaluationContext
 from openfeature.exception import (
     ErrorCode,
     FlagNotFoundError,
+    OpenFeatureError,
     ParseError,
     TypeMismatchError,
 )
@@ -16,6 +19,20 @@ from openfeature.provider import AbstractProvider, Metadata
 from openfeature.track import TrackingEventDetails
 
 from openfeature_flagsmith.exceptions import FlagsmithProviderError
+from openfeature_flagsmith.profiling import SOURCE_CACHE, SOURCE_FETCH, SOURCE_TOKEN
+
+if typing.TYPE_CHECKING:
+    # Importing the client pulls in requests, urllib3 and the flag engine, so
+    # it is only needed for type checking; at runtime the provider just calls
+    # methods on whatever client instance it is given.
+    from flagsmith.flagsmith import Flagsmith
+    from flagsmith.models import Flags
+
+    from openfeature_flagsmith.batching import IdentityFlagsBatcher
+    from openfeature_flagsmith.profiling import EvaluationProfiler
+    from openfeature_flagsmith.snapshot import FlagsToken
+
+logger = logging.getLogger(__name__)
 
 _BASIC_FLAG_TYPE_MAPPINGS = {
     FlagType.BOOLEAN: bool,
@@ -36,6 +53,24 @@ class TrackingMetadata(typing.TypedDict, total=False):
     value: float
 
 
+class _ProviderState(typing.NamedTuple):
+    """
+    Immutable snapshot of a provider's client and configuration.
+
+    Evaluations read the current snapshot once and use it throughout, so they
+    never observe a partially applied reconfiguration and never need a lock.
+    """
+
+    client: Flagsmith
+    use_boolean_config_value: bool
+    return_value_for_disabled_flags: bool
+    use_flagsmith_defaults: bool
+    profiler: typing.Optional[EvaluationProfiler]
+    token_signing_key: typing.Optional[bytes]
+    token_max_age_seconds: typing.Optional[float]
+    identity_batcher: typing.Optional[IdentityFlagsBatcher]
+
+
 class FlagsmithProvider(AbstractProvider):
     def __init__(
         self,
@@ -43,11 +78,118 @@ class FlagsmithProvider(AbstractProvider):
         use_boolean_config_value: bool = False,
         return_value_for_disabled_flags: bool = False,
         use_flagsmith_defaults: bool = False,
+        profiler: typing.Optional[EvaluationProfiler] = None,
+        token_signing_key: typing.Optional[bytes] = None,
+        identity_batcher: typing.Optional[IdentityFlagsBatcher] = None,
+        token_max_age_seconds: typing.Optional[float] = 60,
     ):
-        self._client = client
-        self.return_value_for_disabled_flags = return_value_for_disabled_flags
-        self.use_flagsmith_defaults = use_flagsmith_defaults
-        self.use_boolean_config_value = use_boolean_config_value
+        self._state = _ProviderState(
+            client=client,
+            use_boolean_config_value=use_boolean_config_value,
+            return_value_for_disabled_flags=return_value_for_disabled_flags,
+            use_flagsmith_defaults=use_flagsmith_defaults,
+            profiler=profiler,
+            token_signing_key=token_signing_key,
+            token_max_age_seconds=token_max_age_seconds,
+            identity_batcher=identity_batcher,
+        )
+        # Flags imported from a token, scoped to the current thread or task.
+        self._flags_token: contextvars.ContextVar[
+            typing.Optional[FlagsToken]
+        ] = contextvars.ContextVar("flagsmith_flags_token", default=None)
+        # Only writers take this lock; readers rely on the attribute swap
+        # in `reconfigure` being atomic.
+        self._state_lock = threading.Lock()
+
+    @property
+    def client(self) -> Flagsmith:
+        return self._state.client
+
+    @property
+    def use_boolean_config_value(self) -> bool:
+        return self._state.use_boolean_config_value
+
+    @use_boolean_config_value.setter
+    def use_boolean_config_value(self, value: bool) -> None:
+        self.reconfigure(use_boolean_config_value=value)
+
+    @property
+    def return_value_for_disabled_flags(self) -> bool:
+        return self._state.return_value_for_disabled_flags
+
+    @return_value_for_disabled_flags.setter
+    def return_value_for_disabled_flags(self, value: bool) -> None:
+        self.reconfigure(return_value_for_disabled_flags=value)
+
+    @property
+    def use_flagsmith_defaults(self) -> bool:
+        return self._state.use_flagsmith_defaults
+
+    @use_flagsmith_defaults.setter
+    def use_flagsmith_defaults(self, value: bool) -> None:
+        self.reconfigure(use_flagsmith_defaults=value)
+
+    def reconfigure(self, **changes: typing.Any) -> None:
+        """
+        Atomically replaces any of the provider's constructor arguments.
+
+        All changes are applied together: concurrent evaluations see either
+        the previous configuration or the new one, never a mix of the two.
+        """
+        with self._state_lock:
+            self._state = self._state._replace(**changes)
+
+    def export_flags_token(
+        self, evaluation_context: EvaluationContext = EvaluationContext()
+    ) -> str:
+        """
+        Resolves flags for the given context and serialises them into a token
+        that is small enough to propagate in an HTTP header. The token is
+        signed if the provider has a ``token_signing_key``.
+        """
+        from openfeature_flagsmith.snapshot import encode_flags_token
+
+        state = self._state
+        try:
+            flags = self._get_flags(state, evaluation_context)
+        except Exception as e:
+            if (error := self._client_error(e)) is None:
+                raise
+            raise error from e
+
+        return encode_flags_token(
+            evaluation_context.targeting_key,
+            flags,
+            signing_key=state.token_signing_key,
+        )
+
+    @contextlib.contextmanager
+    def use_flags_token(self, token: str) -> typing.Iterator[None]:
+        """
+        Serves evaluations within the block from the flags held in ``token``,
+        as created by ``export_flags_token``, instead of fetching them from
+        the client. Only evaluations for the identity the token was exported
+        for are affected.
+
+        :raises FlagsmithTokenError: if the token cannot be decoded, was
+            issued more than ``token_max_age_seconds`` ago, or the provider
+            has a ``token_signing_key`` and the token's signature is missing
+            or invalid.
+        """
+        from openfeature_flagsmith.snapshot import decode_flags_token
+
+        state = self._state
+        flags_token = decode_flags_token(
+            token,
+            signing_key=state.token_signing_key,
+            default_flag_handler=getattr(state.client, "default_flag_handler", None),
+            max_age_seconds=state.token_max_age_seconds,
+        )
+        reset_token = self._flags_token.set(flags_token)
+        try:
+            yield
+        finally:
+            self._flags_token.reset(reset_token)
 
     def track(
         self,
@@ -62,9 +204,11 @@ class FlagsmithProvider(AbstractProvider):
         An explicit ``tracking_event_details.value`` overrides any same-named
         key in ``attributes``.
         """
+        client = self._state.client
+
         # Guard against older flagsmith versions or duck-typed clients
         # that don't have track_event.
-        if not hasattr(self._client, "track_event"):
+        if not hasattr(client, "track_event"):
             return
 
         identifier = evaluation_context.targeting_key if evaluation_context else None
@@ -81,7 +225,7 @@ class FlagsmithProvider(AbstractProvider):
                 metadata = None
 
         try:
-            self._client.track_event(
+            client.track_event(
                 tracking_event_name,
                 identity_identifier=identifier,
                 traits=traits,
@@ -92,6 +236,14 @@ class FlagsmithProvider(AbstractProvider):
             # configured; OpenFeature spec requires track() to no-op.
             return
 
+    @property
+    def profiler(self) -> typing.Optional[EvaluationProfiler]:
+        return self._state.profiler
+
+    def shutdown(self) -> None:
+        if profiler := self._state.profiler:
+            profiler.log_report(logger)
+
     def get_metadata(self) -> Metadata:
         return Metadata(name="FlagsmithProvider")
 
@@ -152,21 +304,54 @@ class FlagsmithProvider(AbstractProvider):
         default_value: typing.Any,
         evaluation_context: EvaluationContext,
     ) -> FlagResolutionDetails:
+        state = self._state
+        if (profiler := state.profiler) is None:
+            return self._evaluate(
+                state, flag_key, flag_type, default_value, evaluation_context
+            )
+
+        started_at = profiler.start()
+        error_code = None
         try:
-            flag = self._get_flags(evaluation_context).get_flag(flag_key)
-        except FlagsmithClientError as e:
-            raise FlagsmithProviderError(
-                error_code=ErrorCode.GENERAL,
-                error_message="An error occurred retrieving flags from Flagsmith client.",
-            ) from e
+            return self._evaluate(
+                state, flag_key, flag_type, default_value, evaluation_context
+            )
+        except OpenFeatureError as e:
+            error_code = e.error_code
+            raise
+        except Exception:
+            error_code = ErrorCode.GENERAL
+            raise
+        finally:
+            profiler.record(
+                flag_key,
+                source=self._flags_source(state, evaluation_context),
+                started_at=started_at,
+                error_code=error_code,
+            )
+
+    def _evaluate(
+        self,
+        state: _ProviderState,
+        flag_key: str,
+        flag_type: FlagType,
+        default_value: typing.Any,
+        evaluation_context: EvaluationContext,
+    ) -> FlagResolutionDetails:
+        try:
+            flag = self._get_flags(state, evaluation_context).get_flag(flag_key)
+        except Exception as e:
+            if (error := self._client_error(e)) is None:
+                raise
+            raise error from e
 
-        if flag.is_default and not self.use_flagsmith_defaults:
+        if flag.is_default and not state.use_flagsmith_defaults:
             raise FlagNotFoundError(error_message="Flag '%s' was not found." % flag_key)
 
-        if flag_type == FlagType.BOOLEAN and not self.use_boolean_config_value:
+        if flag_type == FlagType.BOOLEAN and not state.use_boolean_config_value:
             return FlagResolutionDetails(value=flag.enabled)
 
-        if not (self.return_value_for_disabled_flags or flag.enabled):
+        if not (state.return_value_for_disabled_flags or flag.enabled):
             raise FlagsmithProviderError(
                 error_code=ErrorCode.GENERAL,
                 error_message="Flag '%s' is not enabled." % flag_key,
@@ -176,9 +361,11 @@ class FlagsmithProvider(AbstractProvider):
         if required_type and isinstance(flag.value, required_type):
             return FlagResolutionDetails(value=flag.value)
         elif flag_type is FlagType.OBJECT and isinstance(flag.value, str):
+            import json
+
             try:
                 return FlagResolutionDetails(value=json.loads(flag.value))
-            except JSONDecodeError as e:
+            except json.JSONDecodeError as e:
                 msg = "Unable to parse object from value for flag '%s'" % flag_key
                 raise ParseError(error_message=msg) from e
 
@@ -198,10 +385,74 @@ class FlagsmithProvider(AbstractProvider):
         merged = {**flat, **nested}
         return merged or None
 
-    def _get_flags(self, evaluation_context: EvaluationContext = EvaluationContext()):
+    @staticmethod
+    def _client_error(e: Exception) -> typing.Optional[FlagsmithProviderError]:
+        """
+        Returns the error to raise in place of an exception raised while
+        retrieving flags, or None if the exception should propagate as is.
+        """
+        # Imported lazily: by the time a client raises, flagsmith is loaded.
+        from flagsmith.exceptions import FlagsmithClientError
+
+        if not isinstance(e, FlagsmithClientError):
+            return None
+        return FlagsmithProviderError(
+            error_code=ErrorCode.GENERAL,
+            error_message="An error occurred retrieving flags from Flagsmith client.",
+        )
+
+    def _imported_flags(
+        self, evaluation_context: EvaluationContext
+    ) -> typing.Optional[Flags]:
+        flags_token = self._flags_token.get()
+        if (
+            flags_token is not None
+            and flags_token.identifier == evaluation_context.targeting_key
+        ):
+            return flags_token.flags
+        return None
+
+    def _flags_source(
+        self, state: _ProviderState, evaluation_context: EvaluationContext
+    ) -> str:
+        """
+        Reports whether flags for this evaluation came from an imported flags
+        token, the client's locally cached environment document or a request
+        to the API.
+        """
+        if self._imported_flags(evaluation_context) is not None:
+            return SOURCE_TOKEN
+        if self._evaluates_locally(state.client):
+            return SOURCE_CACHE
+        return SOURCE_FETCH
+
+    @staticmethod
+    def _evaluates_locally(client: Flagsmith) -> bool:
+        # Mirrors the client's own check: without an environment document,
+        # a locally evaluating client falls back to the API.
+        return (
+            getattr(client, "offline_mode", False)
+            or getattr(client, "enable_local_evaluation", False)
+        ) and getattr(client, "_evaluation_context", None) is not None
+
+    def _get_flags(
+        self,
+        state: _ProviderState,
+        evaluation_context: EvaluationContext = EvaluationContext(),
+    ) -> Flags:
+        if (flags := self._imported_flags(evaluation_context)) is not None:
+            return flags
         if targeting_key := evaluation_context.targeting_key:
-            return self._client.get_identity_flags(
-                identifier=targeting_key,
-                traits=self._extract_traits(evaluation_context) or {},
+            traits = self._extract_traits(evaluation_context) or {}
+            # Locally evaluated identities are cheap, so batching them would
+            # only add latency.
+            if state.identity_batcher is not None and not self._evaluates_locally(
+                state.client
+            ):
+                return state.identity_batcher.get_identity_flags(
+                    state.client, targeting_key, traits
+                )
+            return state.client.get_identity_flags(
+                identifier=targeting_key, traits=traits
             )
-        return self._client.get_environment_flags()
+        return state.client.get_environment_flags()
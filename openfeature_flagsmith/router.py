@@ -0,0 +1,383 @@
+from __future__ import annotations
+
+import collections
+import logging
+import threading
+import time
+import typing
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from flagsmith.flagsmith import Flagsmith
+from openfeature.evaluation_context import EvaluationContext
+from openfeature.exception import (
+    InvalidContextError,
+    OpenFeatureError,
+    ProviderFatalError,
+)
+from openfeature.flag_evaluation import FlagResolutionDetails
+from openfeature.provider import AbstractProvider, Metadata
+from openfeature.track import TrackingEventDetails
+
+from openfeature_flagsmith.factory import FlagsmithProviderFactory
+from openfeature_flagsmith.provider import FlagsmithProvider
+
+logger = logging.getLogger(__name__)
+
+
+class _Environment:
+    __slots__ = ("provider", "created", "last_used")
+
+    def __init__(self) -> None:
+        # None until the creating caller has built the provider; other
+        # callers wait on ``created``.
+        self.provider: typing.Optional[FlagsmithProvider] = None
+        self.created: Future[FlagsmithProvider] = Future()
+        self.last_used = time.monotonic()
+
+
+class FlagsmithRouterProvider(AbstractProvider):
+    """
+    Routes evaluations to a per-tenant Flagsmith environment, chosen by an
+    attribute of the evaluation context.
+
+    Clients are created on first use through a shared
+    ``FlagsmithProviderFactory`` and at most ``max_environments`` are kept,
+    evicting the least recently used. Instead of each client polling for its
+    environment document on its own thread, one shared pool of
+    ``refresh_workers`` threads refreshes every resident environment and
+    releases evicted ones.
+    """
+
+    def __init__(
+        self,
+        environment_keys: typing.Union[
+            typing.Mapping[str, str], typing.Callable[[str], typing.Optional[str]]
+        ],
+        tenant_attribute: str = "tenant",
+        max_environments: int = 100,
+        max_idle_seconds: typing.Optional[float] = None,
+        enable_local_evaluation: bool = False,
+        environment_refresh_interval_seconds: typing.Union[int, float] = 60,
+        refresh_workers: int = 4,
+        factory: typing.Optional[FlagsmithProviderFactory] = None,
+        client_kwargs: typing.Optional[typing.Dict[str, typing.Any]] = None,
+        **provider_kwargs: typing.Any,
+    ):
+        """
+        :param environment_keys: mapping from tenant to environment key, or a
+            callable returning the environment key for a tenant (or None if
+            the tenant is unknown)
+        :param tenant_attribute: evaluation context attribute holding the
+            tenant. It is not forwarded to Flagsmith as a trait.
+        :param max_environments: maximum number of clients kept at once
+        :param max_idle_seconds: if set, clients unused for this long are
+            evicted by the background workers
+        :param enable_local_evaluation: evaluate flags locally from each
+            environment's document, refreshed by the shared workers. Requires
+            server-side environment keys.
+        :param environment_refresh_interval_seconds: interval between runs of
+            the background workers
+        :param refresh_workers: number of threads refreshing and releasing
+            environments
+        :param factory: factory used to create clients. Defaults to a new
+            factory owned, and closed on shutdown, by the router.
+        :param client_kwargs: other arguments for each Flagsmith client
+        :param provider_kwargs: arguments for each FlagsmithProvider. Objects
+            such as an ``IdentityFlagsBatcher`` or ``EvaluationProfiler`` are
+            shared by all tenants.
+        """
+        if max_environments < 1:
+            raise ValueError("max_environments must be a positive integer.")
+        if client_kwargs and "enable_local_evaluation" in client_kwargs:
+            raise ValueError("enable_local_evaluation must be set on the router.")
+
+        self._environment_keys = (
+            environment_keys
+            if callable(environment_keys)
+            else typing.cast(typing.Mapping[str, str], environment_keys).get
+        )
+        self.tenant_attribute = tenant_attribute
+        self.max_environments = max_environments
+        self.max_idle_seconds = max_idle_seconds
+        self.enable_local_evaluation = enable_local_evaluation
+        self.environment_refresh_interval_seconds = environment_refresh_interval_seconds
+        self._owns_factory = factory is None
+        self._factory = factory or FlagsmithProviderFactory()
+        self._client_kwargs = client_kwargs or {}
+        self._provider_kwargs = provider_kwargs
+
+        self._environments: collections.OrderedDict[
+            str, _Environment
+        ] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Threads are only started once work is submitted.
+        self._executor = ThreadPoolExecutor(
+            max_workers=refresh_workers,
+            thread_name_prefix="flagsmith-router-refresh",
+        )
+        self._stop_event = threading.Event()
+        self._worker: typing.Optional[threading.Thread] = None
+        if enable_local_evaluation or max_idle_seconds is not None:
+            self._worker = threading.Thread(
+                target=self._run_worker, name="flagsmith-router", daemon=True
+            )
+            self._worker.start()
+
+    @property
+    def tenants(self) -> typing.List[str]:
+        """
+        Tenants with a resident client, least recently used first.
+        """
+        with self._lock:
+            return list(self._environments)
+
+    def get_metadata(self) -> Metadata:
+        return Metadata(name="FlagsmithRouterProvider")
+
+    def shutdown(self) -> None:
+        # Stop the worker before its executor, so it never submits
+        # refreshes to an executor that has been shut down.
+        self._stop_event.set()
+        if self._worker and self._worker is not threading.current_thread():
+            self._worker.join()
+        with self._lock:
+            self._closed = True
+            environments = list(self._environments.values())
+            self._environments.clear()
+        # Waits for evicted environments still being released.
+        self._executor.shutdown()
+        for environment in environments:
+            self._release(environment)
+        if self._owns_factory:
+            self._factory.close()
+        if profiler := self._provider_kwargs.get("profiler"):
+            profiler.log_report(logger)
+
+    def track(
+        self,
+        tracking_event_name: str,
+        evaluation_context: typing.Optional[EvaluationContext] = None,
+        tracking_event_details: typing.Optional[TrackingEventDetails] = None,
+    ) -> None:
+        """
+        Records a custom event with the tenant's provider.
+
+        No-ops if the evaluation context does not identify a known tenant, or
+        the router has been shut down.
+        """
+        try:
+            provider, evaluation_context = self._route(
+                evaluation_context or EvaluationContext()
+            )
+        except OpenFeatureError as e:
+            logger.debug(
+                "Not tracking event '%s': %s", tracking_event_name, e.error_message
+            )
+            return
+        provider.track(tracking_event_name, evaluation_context, tracking_event_details)
+
+    def resolve_boolean_details(
+        self,
+        flag_key: str,
+        default_value: bool,
+        evaluation_context: EvaluationContext = EvaluationContext(),
+    ) -> FlagResolutionDetails[bool]:
+        provider, evaluation_context = self._route(evaluation_context)
+        return provider.resolve_boolean_details(
+            flag_key, default_value, evaluation_context
+        )
+
+    def resolve_string_details(
+        self,
+        flag_key: str,
+        default_value: str,
+        evaluation_context: EvaluationContext = EvaluationContext(),
+    ) -> FlagResolutionDetails[str]:
+        provider, evaluation_context = self._route(evaluation_context)
+        return provider.resolve_string_details(
+            flag_key, default_value, evaluation_context
+        )
+
+    def resolve_integer_details(
+        self,
+        flag_key: str,
+        default_value: int,
+        evaluation_context: EvaluationContext = EvaluationContext(),
+    ) -> FlagResolutionDetails[int]:
+        provider, evaluation_context = self._route(evaluation_context)
+        return provider.resolve_integer_details(
+            flag_key, default_value, evaluation_context
+        )
+
+    def resolve_float_details(
+        self,
+        flag_key: str,
+        default_value: float,
+        evaluation_context: EvaluationContext = EvaluationContext(),
+    ) -> FlagResolutionDetails[float]:
+        provider, evaluation_context = self._route(evaluation_context)
+        return provider.resolve_float_details(
+            flag_key, default_value, evaluation_context
+        )
+
+    def resolve_object_details(
+        self,
+        flag_key: str,
+        default_value: typing.Union[dict, list],
+        evaluation_context: EvaluationContext = EvaluationContext(),
+    ) -> FlagResolutionDetails[typing.Union[dict, list]]:
+        provider, evaluation_context = self._route(evaluation_context)
+        return provider.resolve_object_details(
+            flag_key, default_value, evaluation_context
+        )
+
+    def _route(
+        self, evaluation_context: EvaluationContext
+    ) -> typing.Tuple[FlagsmithProvider, EvaluationContext]:
+        """
+        Returns the provider for the context's tenant, and the context with
+        the tenant attribute removed.
+        """
+        attributes = evaluation_context.attributes or {}
+        tenant = attributes.get(self.tenant_attribute)
+        if tenant is None:
+            raise InvalidContextError(
+                "Evaluation context has no '%s' attribute." % self.tenant_attribute
+            )
+
+        provider = self._get_provider(tenant)
+        return provider, EvaluationContext(
+            targeting_key=evaluation_context.targeting_key,
+            attributes={
+                k: v for k, v in attributes.items() if k != self.tenant_attribute
+            },
+        )
+
+    def _get_provider(self, tenant: str) -> FlagsmithProvider:
+        with self._lock:
+            self._check_open()
+            if environment := self._environments.get(tenant):
+                self._environments.move_to_end(tenant)
+                environment.last_used = time.monotonic()
+        if environment:
+            return environment.created.result()
+
+        environment_key = self._environment_keys(tenant)
+        if environment_key is None:
+            raise InvalidContextError("Unknown tenant '%s'." % tenant)
+
+        with self._lock:
+            self._check_open()
+            environment = self._environments.get(tenant)
+            is_creator = environment is None
+            if environment is None:
+                environment = self._environments[tenant] = _Environment()
+            self._environments.move_to_end(tenant)
+        if not is_creator:
+            return environment.created.result()
+
+        # Only the first caller creates the client, without holding the lock
+        # since this may fetch the environment document; concurrent first
+        # uses of the tenant wait for it.
+        try:
+            provider = self._create_provider(environment_key)
+        except BaseException as e:
+            with self._lock:
+                if self._environments.get(tenant) is environment:
+                    del self._environments[tenant]
+            environment.created.set_exception(e)
+            raise
+
+        evicted = []
+        with self._lock:
+            environment.provider = provider
+            if self._environments.get(tenant) is not environment:
+                # Removed by a shutdown while being created.
+                evicted.append(environment)
+            excess = len(self._environments) - self.max_environments
+            for lru_tenant, lru_environment in list(self._environments.items()):
+                if excess <= 0:
+                    break
+                if lru_environment.provider is not None:
+                    evicted.append(self._environments.pop(lru_tenant))
+                    excess -= 1
+        environment.created.set_result(provider)
+
+        # Releasing a client may flush its analytics over HTTP, so this is
+        # left to the shared workers rather than the evaluating thread.
+        for stale in evicted:
+            try:
+                self._executor.submit(self._release_evicted, stale)
+            except RuntimeError:
+                # The router is being shut down.
+                self._release(stale)
+        return provider
+
+    def _check_open(self) -> None:
+        if self._closed:
+            raise ProviderFatalError("Router provider has been shut down.")
+
+    def _create_provider(self, environment_key: str) -> FlagsmithProvider:
+        client = self._factory.create_client(environment_key, **self._client_kwargs)
+        if self.enable_local_evaluation:
+            if not environment_key.startswith("ser."):
+                self._factory.release_client(client)
+                raise ValueError(
+                    "In order to use local evaluation, please generate a server key "
+                    "in the environment settings page."
+                )
+            # Enabled after construction so the client does not start its own
+            # polling thread; the router's workers refresh it instead.
+            client.enable_local_evaluation = True
+            client.update_environment()
+        return FlagsmithProvider(client, **self._provider_kwargs)
+
+    def _release(self, environment: _Environment) -> None:
+        if environment.provider is not None:
+            self._factory.release_client(environment.provider.client)
+
+    def _release_evicted(self, environment: _Environment) -> None:
+        try:
+            self._release(environment)
+        except Exception:
+            logger.exception("Error releasing evicted environment")
+
+    def _run_worker(self) -> None:
+        while not self._stop_event.wait(self.environment_refresh_interval_seconds):
+            try:
+                self._run_background_tasks()
+            except Exception:
+                logger.exception("Error running background tasks")
+
+    def _run_background_tasks(self) -> None:
+        if self.max_idle_seconds is not None:
+            idle_before = time.monotonic() - self.max_idle_seconds
+            with self._lock:
+                idle = [
+                    tenant
+                    for tenant, environment in self._environments.items()
+                    if environment.provider is not None
+                    and environment.last_used < idle_before
+                ]
+                evicted = [self._environments.pop(tenant) for tenant in idle]
+            for environment in evicted:
+                self._release(environment)
+
+        if self.enable_local_evaluation and not self._stop_event.is_set():
+            with self._lock:
+                clients = [
+                    environment.provider.client
+                    for environment in self._environments.values()
+                    if environment.provider is not None
+                ]
+            for _ in self._executor.map(self._refresh, clients):
+                pass
+
+    @staticmethod
+    def _refresh(client: Flagsmith) -> None:
+        try:
+            client.update_environment()
+        except Exception:
+            logger.exception("Error updating environment")
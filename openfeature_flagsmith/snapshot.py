@@ -0,0 +1,139 @@
+"""
+Compact, URL-safe tokens holding a snapshot of resolved flags.
+
+A token is the URL-safe base64 encoding (without padding) of::
+
+    version (1 byte) | options (1 byte) | zlib(payload) | signature (optional)
+
+where the payload is the compact JSON array
+``[issued_at, identifier, [[feature_name, feature_id, enabled, value], ...]]``,
+``issued_at`` is a Unix timestamp in seconds and the signature is a truncated
+HMAC-SHA256 over everything that precedes it.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+import time
+import typing
+import zlib
+
+from flagsmith.models import DefaultFlag, Flag, Flags
+
+from openfeature_flagsmith.exceptions import FlagsmithTokenError
+
+TOKEN_VERSION = 1
+
+# Upper bound on the decompressed payload, so that a small crafted token
+# cannot expand into an arbitrarily large amount of memory.
+MAX_PAYLOAD_SIZE = 256 * 1024
+
+_OPTION_SIGNED = 0x01
+_SIGNATURE_LENGTH = 16
+
+
+class FlagsToken(typing.NamedTuple):
+    identifier: typing.Optional[str]
+    flags: Flags
+    issued_at: int
+
+
+def encode_flags_token(
+    identifier: typing.Optional[str],
+    flags: Flags,
+    signing_key: typing.Optional[bytes] = None,
+) -> str:
+    """
+    Serialises ``flags`` resolved for ``identifier`` (or for the environment,
+    if None) into a token, signing it if ``signing_key`` is given.
+    """
+    payload = json.dumps(
+        [
+            int(time.time()),
+            identifier,
+            [
+                [flag.feature_name, flag.feature_id, flag.enabled, flag.value]
+                for flag in flags.all_flags()
+            ],
+        ],
+        separators=(",", ":"),
+    ).encode()
+
+    options = _OPTION_SIGNED if signing_key else 0
+    data = bytes((TOKEN_VERSION, options)) + zlib.compress(payload, 9)
+    if signing_key:
+        data += _sign(signing_key, data)
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def decode_flags_token(
+    token: str,
+    signing_key: typing.Optional[bytes] = None,
+    default_flag_handler: typing.Optional[typing.Callable[[str], DefaultFlag]] = None,
+    max_age_seconds: typing.Optional[float] = None,
+) -> FlagsToken:
+    """
+    Restores the flags held in a token created by ``encode_flags_token``.
+
+    If ``signing_key`` is given, the token must carry a valid signature. If
+    ``max_age_seconds`` is given, the token must have been issued no longer
+    than that ago.
+
+    :raises FlagsmithTokenError: if the token is malformed, of an unsupported
+        version, fails signature verification or has expired.
+    """
+    try:
+        data = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (ValueError, TypeError) as e:
+        raise FlagsmithTokenError("Flags token is not valid base64.") from e
+
+    if len(data) < 2:
+        raise FlagsmithTokenError("Flags token is truncated.")
+
+    version, options = data[0], data[1]
+    if version != TOKEN_VERSION:
+        raise FlagsmithTokenError("Unsupported flags token version %d." % version)
+
+    signed = bool(options & _OPTION_SIGNED)
+    if signed:
+        data, signature = data[:-_SIGNATURE_LENGTH], data[-_SIGNATURE_LENGTH:]
+        if signing_key and not hmac.compare_digest(signature, _sign(signing_key, data)):
+            raise FlagsmithTokenError("Flags token signature is invalid.")
+    elif signing_key:
+        raise FlagsmithTokenError("Flags token is not signed.")
+
+    try:
+        decompressor = zlib.decompressobj()
+        payload = decompressor.decompress(data[2:], MAX_PAYLOAD_SIZE)
+        if decompressor.unconsumed_tail or not decompressor.eof:
+            raise ValueError("Flags token payload is too large or incomplete.")
+        issued_at, identifier, flags_data = json.loads(payload)
+        if not isinstance(issued_at, int):
+            raise TypeError("Flags token issue time is not an integer.")
+        flags = {
+            feature_name: Flag(
+                enabled=enabled,
+                value=value,
+                feature_id=feature_id,
+                feature_name=feature_name,
+            )
+            for feature_name, feature_id, enabled, value in flags_data
+        }
+    except (zlib.error, ValueError, TypeError) as e:
+        raise FlagsmithTokenError("Flags token payload is malformed.") from e
+
+    if max_age_seconds is not None and time.time() - issued_at > max_age_seconds:
+        raise FlagsmithTokenError("Flags token has expired.")
+
+    return FlagsToken(
+        identifier=identifier,
+        flags=Flags(flags=flags, default_flag_handler=default_flag_handler),
+        issued_at=issued_at,
+    )
+
+
+def _sign(signing_key: bytes, data: bytes) -> bytes:
+    return hmac.new(signing_key, data, hashlib.sha256).digest()[:_SIGNATURE_LENGTH]
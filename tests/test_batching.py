@@ -0,0 +1,311 @@
+import threading
+import time
+import typing
+from unittest.mock import MagicMock
+
+import pytest
+from flagsmith import Flagsmith
+from flagsmith.exceptions import FlagsmithAPIError
+from flagsmith.models import Flag, Flags
+from openfeature.evaluation_context import EvaluationContext
+from openfeature.exception import ErrorCode
+
+from openfeature_flagsmith.batching import IdentityFlagsBatcher, IdentityRequest
+from openfeature_flagsmith.exceptions import FlagsmithProviderError
+from openfeature_flagsmith.provider import FlagsmithProvider
+
+
+class BulkIdentitiesEndpoint:
+    """
+    Local stand-in for a bulk identities endpoint: returns a flag whose value
+    is the identifier it was resolved for, and records every batch it serves.
+    """
+
+    def __init__(self) -> None:
+        self.batches: typing.List[typing.List[IdentityRequest]] = []
+        self._lock = threading.Lock()
+
+    def __call__(
+        self, client: Flagsmith, requests: typing.Sequence[IdentityRequest]
+    ) -> typing.List[Flags]:
+        with self._lock:
+            self.batches.append(list(requests))
+        return [
+            Flags(
+                {
+                    "key": Flag(
+                        feature_id=1,
+                        feature_name="key",
+                        enabled=True,
+                        value=request.identifier,
+                    )
+                }
+            )
+            for request in requests
+        ]
+
+
+@pytest.fixture()
+def mock_flagsmith_client() -> MagicMock:
+    return MagicMock(spec=Flagsmith)
+
+
+@pytest.fixture()
+def endpoint() -> BulkIdentitiesEndpoint:
+    return BulkIdentitiesEndpoint()
+
+
+def _resolve_concurrently(
+    provider: FlagsmithProvider,
+    identifiers: typing.List[str],
+    return_errors: bool = False,
+) -> typing.Dict[str, typing.Any]:
+    results = {}
+    barrier = threading.Barrier(len(identifiers))
+
+    def resolve(identifier: str) -> None:
+        barrier.wait()
+        try:
+            results[identifier] = provider.resolve_string_details(
+                "key",
+                default_value="default",
+                evaluation_context=EvaluationContext(targeting_key=identifier),
+            ).value
+        except Exception as e:
+            if not return_errors:
+                raise
+            results[identifier] = e
+
+    threads = [threading.Thread(target=resolve, args=(i,)) for i in identifiers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_identity_requests_are_batched(
+    mock_flagsmith_client: MagicMock, endpoint: BulkIdentitiesEndpoint
+) -> None:
+    # Given
+    batcher = IdentityFlagsBatcher(endpoint, max_wait_seconds=0.5)
+    provider = FlagsmithProvider(mock_flagsmith_client, identity_batcher=batcher)
+    identifiers = [f"user_{i}" for i in range(20)]
+
+    # When
+    results = _resolve_concurrently(provider, identifiers)
+
+    # Then - every caller gets its own identity's flags from far fewer calls
+    assert results == {identifier: identifier for identifier in identifiers}
+    assert len(endpoint.batches) < len(identifiers)
+    assert sum(len(batch) for batch in endpoint.batches) == len(identifiers)
+    mock_flagsmith_client.get_identity_flags.assert_not_called()
+
+
+def test_batch_is_fetched_once_max_batch_size_is_reached(
+    mock_flagsmith_client: MagicMock, endpoint: BulkIdentitiesEndpoint
+) -> None:
+    # Given - a window long enough that the test would time out waiting on it
+    batcher = IdentityFlagsBatcher(endpoint, max_wait_seconds=60, max_batch_size=2)
+    provider = FlagsmithProvider(mock_flagsmith_client, identity_batcher=batcher)
+
+    # When
+    results = _resolve_concurrently(provider, ["user_1", "user_2"])
+
+    # Then
+    assert results == {"user_1": "user_1", "user_2": "user_2"}
+    assert [len(batch) for batch in endpoint.batches] == [2]
+
+
+def test_duplicate_identity_requests_share_a_fetch(
+    mock_flagsmith_client: MagicMock, endpoint: BulkIdentitiesEndpoint
+) -> None:
+    # Given
+    batcher = IdentityFlagsBatcher(endpoint, max_wait_seconds=0.1)
+
+    # When
+    results = []
+
+    def resolve() -> None:
+        results.append(
+            batcher.get_identity_flags(mock_flagsmith_client, "user", {"foo": "bar"})
+        )
+
+    threads = [threading.Thread(target=resolve) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Then
+    assert len(results) == 5
+    assert sum(len(batch) for batch in endpoint.batches) == len(endpoint.batches)
+
+
+def test_batch_fetch_errors_are_raised_to_every_caller(
+    mock_flagsmith_client: MagicMock,
+) -> None:
+    # Given
+    def failing_endpoint(
+        client: Flagsmith, requests: typing.Sequence[IdentityRequest]
+    ) -> typing.List[Flags]:
+        raise FlagsmithAPIError("")
+
+    batcher = IdentityFlagsBatcher(failing_endpoint, max_wait_seconds=0)
+    provider = FlagsmithProvider(mock_flagsmith_client, identity_batcher=batcher)
+
+    # When
+    with pytest.raises(FlagsmithProviderError) as e:
+        provider.resolve_string_details(
+            "key",
+            default_value="default",
+            evaluation_context=EvaluationContext(targeting_key="user"),
+        )
+
+    # Then
+    assert e.value.error_code == ErrorCode.GENERAL
+
+
+def test_batch_fetch_result_count_mismatch_raises(
+    mock_flagsmith_client: MagicMock,
+) -> None:
+    batcher = IdentityFlagsBatcher(lambda client, requests: [], max_wait_seconds=0)
+
+    with pytest.raises(ValueError):
+        batcher.get_identity_flags(mock_flagsmith_client, "user", {})
+
+
+def test_bulk_fetch_errors_for_single_identities_only_fail_their_callers(
+    mock_flagsmith_client: MagicMock, endpoint: BulkIdentitiesEndpoint
+) -> None:
+    # Given
+    def partially_failing_endpoint(
+        client: Flagsmith, requests: typing.Sequence[IdentityRequest]
+    ) -> typing.List[typing.Union[Flags, BaseException]]:
+        return [
+            FlagsmithAPIError("") if request.identifier == "bad" else flags
+            for request, flags in zip(requests, endpoint(client, requests))
+        ]
+
+    batcher = IdentityFlagsBatcher(partially_failing_endpoint, max_wait_seconds=0.5)
+    provider = FlagsmithProvider(mock_flagsmith_client, identity_batcher=batcher)
+
+    # When
+    results = _resolve_concurrently(provider, ["good", "bad"], return_errors=True)
+
+    # Then
+    assert results["good"] == "good"
+    assert isinstance(results["bad"], FlagsmithProviderError)
+
+
+def _identity_flags(identifier: str, traits: typing.Any) -> Flags:
+    time.sleep(0.05)
+    if identifier == "user_0":
+        raise FlagsmithAPIError("")
+    return Flags(
+        {"key": Flag(feature_id=1, feature_name="key", enabled=True, value=identifier)}
+    )
+
+
+def test_default_fetch_isolates_errors_per_identity(
+    mock_flagsmith_client: MagicMock,
+) -> None:
+    # Given
+    mock_flagsmith_client.get_identity_flags.side_effect = _identity_flags
+    batcher = IdentityFlagsBatcher()
+    provider = FlagsmithProvider(mock_flagsmith_client, identity_batcher=batcher)
+    identifiers = [f"user_{i}" for i in range(20)]
+
+    # When
+    results = _resolve_concurrently(provider, identifiers, return_errors=True)
+
+    # Then
+    assert isinstance(results.pop("user_0"), FlagsmithProviderError)
+    assert results == {identifier: identifier for identifier in identifiers[1:]}
+
+
+def test_default_fetch_requests_identities_concurrently(
+    mock_flagsmith_client: MagicMock,
+) -> None:
+    # Given - each request takes 50ms
+    mock_flagsmith_client.get_identity_flags.side_effect = _identity_flags
+    batcher = IdentityFlagsBatcher()
+    provider = FlagsmithProvider(mock_flagsmith_client, identity_batcher=batcher)
+    identifiers = [f"user_{i}" for i in range(1, 11)]
+
+    # When
+    started_at = time.monotonic()
+    results = _resolve_concurrently(provider, identifiers)
+    elapsed = time.monotonic() - started_at
+
+    # Then - well under the 500ms it would take to fetch one after another
+    assert results == {identifier: identifier for identifier in identifiers}
+    assert mock_flagsmith_client.get_identity_flags.call_count == 10
+    assert elapsed < 0.3
+
+
+def test_default_fetch_shares_duplicate_requests(
+    mock_flagsmith_client: MagicMock,
+) -> None:
+    # Given
+    mock_flagsmith_client.get_identity_flags.side_effect = _identity_flags
+    batcher = IdentityFlagsBatcher()
+    provider = FlagsmithProvider(mock_flagsmith_client, identity_batcher=batcher)
+
+    # When
+    results = _resolve_concurrently(provider, ["user_1"] * 5)
+
+    # Then
+    assert results == {"user_1": "user_1"}
+    mock_flagsmith_client.get_identity_flags.assert_called_once_with(
+        identifier="user_1", traits={}
+    )
+
+
+def test_default_fetch_does_not_wait_for_other_callers(
+    mock_flagsmith_client: MagicMock,
+) -> None:
+    # Given - a window long enough that the test would time out waiting on it
+    mock_flagsmith_client.get_identity_flags.side_effect = _identity_flags
+    batcher = IdentityFlagsBatcher(max_wait_seconds=60)
+
+    # When
+    first = batcher.get_identity_flags(mock_flagsmith_client, "user_1", {})
+    second = batcher.get_identity_flags(mock_flagsmith_client, "user_1", {})
+
+    # Then - completed fetches are not reused
+    assert first.get_feature_value("key") == second.get_feature_value("key")
+    assert mock_flagsmith_client.get_identity_flags.call_count == 2
+    assert batcher._batches == {}
+
+
+def test_batching_is_skipped_for_locally_evaluating_clients(
+    mock_flagsmith_client: MagicMock, endpoint: BulkIdentitiesEndpoint
+) -> None:
+    # Given
+    mock_flagsmith_client.enable_local_evaluation = True
+    mock_flagsmith_client._evaluation_context = {
+        "environment": {"key": "key", "name": "name"}
+    }
+    mock_flagsmith_client.get_identity_flags.return_value = Flags()
+    batcher = IdentityFlagsBatcher(endpoint, max_wait_seconds=0.01)
+    provider = FlagsmithProvider(mock_flagsmith_client, identity_batcher=batcher)
+
+    # When
+    with pytest.raises(FlagsmithProviderError):
+        provider.resolve_string_details(
+            "key",
+            default_value="default",
+            evaluation_context=EvaluationContext(targeting_key="user"),
+        )
+
+    # Then
+    assert endpoint.batches == []
+    mock_flagsmith_client.get_identity_flags.assert_called_once_with(
+        identifier="user", traits={}
+    )
+
+
+def test_batcher_rejects_invalid_max_batch_size() -> None:
+    with pytest.raises(ValueError):
+        IdentityFlagsBatcher(max_batch_size=0)
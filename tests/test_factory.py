@@ -0,0 +1,129 @@
+import json
+import threading
+import typing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+import pytest
+from flagsmith import Flagsmith
+
+from openfeature_flagsmith.factory import FlagsmithProviderFactory
+
+
+class _FlagsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        self.server.requests.append(dict(self.headers))
+        body = json.dumps(
+            [
+                {
+                    "enabled": True,
+                    "feature_state_value": self.headers["X-Environment-Key"],
+                    "feature": {"id": 1, "name": "environment"},
+                }
+            ]
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: typing.Any) -> None:
+        pass
+
+
+@pytest.fixture()
+def api_url() -> typing.Iterator[str]:
+    # Local stand-in for the Flagsmith API
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FlagsHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:%d/api/v1/" % server.server_port
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+def factory() -> typing.Iterator[FlagsmithProviderFactory]:
+    factory = FlagsmithProviderFactory()
+    yield factory
+    factory.close()
+
+
+def test_providers_share_connection_pool(
+    factory: FlagsmithProviderFactory, api_url: str
+) -> None:
+    # Given
+    providers = [
+        factory.create_provider(environment_key, client_kwargs={"api_url": api_url})
+        for environment_key in ["env_1", "env_2", "env_3"]
+    ]
+
+    # When
+    values = [
+        provider.resolve_string_details("environment", "default").value
+        for provider in providers
+    ]
+
+    # Then - each provider used its own environment over one shared connection
+    assert values == ["env_1", "env_2", "env_3"]
+    (stats,) = factory.pool_stats()
+    assert stats.host == "127.0.0.1"
+    assert stats.requests == 3
+    assert stats.connections_created == 1
+    assert stats.idle == 1
+    assert stats.in_use == 0
+    assert len(factory.clients) == 3
+
+
+def test_keep_alive_can_be_disabled(api_url: str) -> None:
+    # Given
+    factory = FlagsmithProviderFactory(keep_alive=False)
+    client = factory.create_client("env", api_url=api_url)
+
+    # When
+    client.get_environment_flags()
+
+    # Then
+    assert client.session.headers["Connection"] == "close"
+    factory.close()
+
+
+def test_create_client_rejects_retries(factory: FlagsmithProviderFactory) -> None:
+    with pytest.raises(ValueError):
+        factory.create_client("env", retries=None)
+
+
+def test_close_releases_clients(
+    factory: FlagsmithProviderFactory, api_url: str
+) -> None:
+    # Given
+    factory.create_client("env", api_url=api_url).get_environment_flags()
+
+    # When
+    factory.close()
+
+    # Then
+    assert factory.clients == []
+    assert factory.pool_stats() == []
+
+
+def test_release_client_stops_background_threads(
+    factory: FlagsmithProviderFactory,
+) -> None:
+    # Given
+    client = MagicMock(spec=Flagsmith)
+    client.environment_data_polling_manager_thread = MagicMock()
+    client._event_processor = MagicMock()
+    client._pipeline_analytics_processor = MagicMock()
+
+    # When
+    factory.release_client(client)
+
+    # Then
+    client.environment_data_polling_manager_thread.stop.assert_called_once_with()
+    client._event_processor.stop.assert_called_once_with()
+    client._pipeline_analytics_processor.stop.assert_called_once_with()
@@ -0,0 +1,54 @@
+import subprocess
+import sys
+import typing
+
+import pytest
+
+# Generous enough to absorb noisy CI runners and bytecode compilation when no
+# cache is available, but far below the cost of importing the Flagsmith client.
+PROVIDER_SELF_IMPORT_BUDGET_US = 25_000
+
+
+def _import_times(module: str) -> typing.Dict[str, typing.Tuple[int, int]]:
+    """
+    Imports ``module`` in a fresh interpreter and returns the
+    ``(self_us, cumulative_us)`` import times reported for each module loaded.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        if not self_us.strip().isdigit():
+            continue  # header row
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+@pytest.fixture(scope="module")
+def provider_import_times() -> typing.Dict[str, typing.Tuple[int, int]]:
+    return _import_times("openfeature_flagsmith.provider")
+
+
+@pytest.mark.parametrize("module", ["flagsmith", "requests", "urllib3", "json"])
+def test_provider_import_defers_heavy_modules(
+    provider_import_times: typing.Dict[str, typing.Tuple[int, int]], module: str
+) -> None:
+    assert module not in provider_import_times
+
+
+def test_provider_import_time_within_budget(
+    provider_import_times: typing.Dict[str, typing.Tuple[int, int]],
+) -> None:
+    own_self_us = sum(
+        self_us
+        for name, (self_us, _) in provider_import_times.items()
+        if name.split(".")[0] == "openfeature_flagsmith"
+    )
+    assert own_self_us < PROVIDER_SELF_IMPORT_BUDGET_US
@@ -0,0 +1,273 @@
+import logging
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from flagsmith import Flagsmith
+from flagsmith.exceptions import FlagsmithClientError
+from flagsmith.models import DefaultFlag, Flag, Flags
+from openfeature.exception import ErrorCode, FlagNotFoundError
+
+from openfeature_flagsmith.exceptions import FlagsmithProviderError
+from openfeature_flagsmith.profiling import (
+    SOURCE_CACHE,
+    SOURCE_FETCH,
+    EvaluationProfiler,
+)
+from openfeature_flagsmith.provider import FlagsmithProvider
+
+
+@pytest.fixture()
+def mock_flagsmith_client() -> MagicMock:
+    return MagicMock(spec=Flagsmith)
+
+
+def test_profiler_rejects_invalid_sample_rate() -> None:
+    with pytest.raises(ValueError):
+        EvaluationProfiler(sample_rate=0)
+
+
+def test_profiler_counts_evaluations_and_sources(
+    mock_flagsmith_client: MagicMock,
+) -> None:
+    # Given
+    profiler = EvaluationProfiler(sample_rate=1)
+    provider = FlagsmithProvider(mock_flagsmith_client, profiler=profiler)
+
+    mock_flagsmith_client.get_environment_flags.return_value = Flags(
+        {
+            "hot": Flag(feature_id=1, feature_name="hot", enabled=True, value="a"),
+            "cold": Flag(feature_id=2, feature_name="cold", enabled=True, value="b"),
+        }
+    )
+
+    # When
+    for _ in range(3):
+        provider.resolve_string_details("hot", default_value="default")
+    provider.resolve_string_details("cold", default_value="default")
+
+    # Then
+    hot, cold = profiler.report()
+    assert hot.flag_key == "hot"
+    assert hot.evaluations == 3
+    assert hot.sampled_evaluations == 3
+    assert hot.sources == {SOURCE_FETCH: 3}
+    assert hot.errors == {}
+    assert cold.flag_key == "cold"
+    assert cold.evaluations == 1
+
+
+def test_profiler_reports_cache_source_for_local_evaluation() -> None:
+    # Given
+    client = MagicMock(spec=Flagsmith)
+    client.enable_local_evaluation = True
+    client._evaluation_context = {"environment": {"key": "key", "name": "name"}}
+    client.get_environment_flags.return_value = Flags(
+        {"key": Flag(feature_id=1, feature_name="key", enabled=True, value="a")}
+    )
+    profiler = EvaluationProfiler()
+    provider = FlagsmithProvider(client, profiler=profiler)
+
+    # When
+    provider.resolve_string_details("key", default_value="default")
+
+    # Then
+    assert profiler.report()[0].sources == {SOURCE_CACHE: 1}
+
+
+def test_profiler_reports_fetch_source_when_local_environment_is_missing() -> None:
+    # Given - local evaluation is enabled, but no environment document has
+    # been retrieved yet, so the client requests flags from the API
+    client = MagicMock(spec=Flagsmith)
+    client.enable_local_evaluation = True
+    client._evaluation_context = None
+    client.get_environment_flags.return_value = Flags(
+        {"key": Flag(feature_id=1, feature_name="key", enabled=True, value="a")}
+    )
+    profiler = EvaluationProfiler()
+    provider = FlagsmithProvider(client, profiler=profiler)
+
+    # When
+    provider.resolve_string_details("key", default_value="default")
+
+    # Then
+    assert profiler.report()[0].sources == {SOURCE_FETCH: 1}
+
+
+def test_profiler_merges_counters_from_all_threads(
+    mock_flagsmith_client: MagicMock,
+) -> None:
+    # Given
+    key = "key"
+    profiler = EvaluationProfiler(sample_rate=1)
+    provider = FlagsmithProvider(mock_flagsmith_client, profiler=profiler)
+
+    mock_flagsmith_client.get_environment_flags.return_value = Flags(
+        {key: Flag(feature_id=1, feature_name=key, enabled=True, value=True)}
+    )
+
+    def resolve() -> None:
+        for _ in range(100):
+            provider.resolve_boolean_details(key, default_value=False)
+
+    threads = [threading.Thread(target=resolve) for _ in range(4)]
+
+    # When
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Then
+    (stats,) = profiler.report()
+    assert stats.evaluations == 400
+    assert stats.sampled_evaluations == 400
+    assert stats.sources == {SOURCE_FETCH: 400}
+
+
+def test_profiler_retires_counters_of_exited_threads(
+    mock_flagsmith_client: MagicMock,
+) -> None:
+    # Given
+    key = "key"
+    profiler = EvaluationProfiler(sample_rate=1)
+    provider = FlagsmithProvider(mock_flagsmith_client, profiler=profiler)
+
+    mock_flagsmith_client.get_environment_flags.return_value = Flags(
+        {key: Flag(feature_id=1, feature_name=key, enabled=True, value=True)}
+    )
+
+    # When - many short-lived threads evaluate once each
+    for _ in range(50):
+        thread = threading.Thread(
+            target=provider.resolve_boolean_details, args=(key, False)
+        )
+        thread.start()
+        thread.join()
+
+    # Then - their counters are kept, but not one shard per thread
+    (stats,) = profiler.report()
+    assert stats.evaluations == 50
+    assert len(profiler._shards) <= 1
+
+
+def test_profiler_reset_clears_counters(mock_flagsmith_client: MagicMock) -> None:
+    # Given
+    key = "key"
+    profiler = EvaluationProfiler()
+    provider = FlagsmithProvider(mock_flagsmith_client, profiler=profiler)
+
+    mock_flagsmith_client.get_environment_flags.return_value = Flags(
+        {key: Flag(feature_id=1, feature_name=key, enabled=True, value=True)}
+    )
+    provider.resolve_boolean_details(key, default_value=False)
+
+    # When
+    profiler.reset()
+    provider.resolve_boolean_details(key, default_value=False)
+
+    # Then
+    (stats,) = profiler.report()
+    assert stats.evaluations == 1
+
+
+def test_profiler_counts_errors_by_error_code(
+    mock_flagsmith_client: MagicMock,
+) -> None:
+    # Given
+    key = "key"
+    profiler = EvaluationProfiler()
+    provider = FlagsmithProvider(mock_flagsmith_client, profiler=profiler)
+
+    mock_flagsmith_client.get_environment_flags.return_value = Flags(
+        {key: DefaultFlag(enabled=True, value="foo")}
+    )
+
+    # When
+    with pytest.raises(FlagNotFoundError):
+        provider.resolve_string_details(key, default_value="default")
+
+    mock_flagsmith_client.get_environment_flags.side_effect = FlagsmithClientError("")
+    with pytest.raises(FlagsmithProviderError):
+        provider.resolve_string_details(key, default_value="default")
+
+    # Then
+    (stats,) = profiler.report()
+    assert stats.evaluations == 2
+    assert stats.errors == {ErrorCode.FLAG_NOT_FOUND: 1, ErrorCode.GENERAL: 1}
+    assert stats.error_count == 2
+
+
+def test_profiler_only_times_sampled_evaluations(
+    mock_flagsmith_client: MagicMock,
+) -> None:
+    # Given
+    key = "key"
+    profiler = EvaluationProfiler(sample_rate=4)
+    provider = FlagsmithProvider(mock_flagsmith_client, profiler=profiler)
+
+    mock_flagsmith_client.get_environment_flags.return_value = Flags(
+        {key: Flag(feature_id=1, feature_name=key, enabled=True, value=True)}
+    )
+
+    # When
+    for _ in range(10):
+        provider.resolve_boolean_details(key, default_value=False)
+
+    # Then
+    (stats,) = profiler.report()
+    assert stats.evaluations == 10
+    assert stats.sampled_evaluations == 3
+    assert stats.estimated_total_time_ns == stats.mean_time_ns * 10
+
+
+def test_profiler_report_is_limited_to_top_k(
+    mock_flagsmith_client: MagicMock,
+) -> None:
+    # Given
+    profiler = EvaluationProfiler()
+    provider = FlagsmithProvider(mock_flagsmith_client, profiler=profiler)
+
+    mock_flagsmith_client.get_environment_flags.return_value = Flags(
+        {
+            key: Flag(feature_id=i, feature_name=key, enabled=True, value=True)
+            for i, key in enumerate(["a", "b", "c"])
+        }
+    )
+
+    # When
+    for key in ["a", "b", "c"]:
+        provider.resolve_boolean_details(key, default_value=False)
+
+    # Then
+    assert len(profiler.report(top_k=2)) == 2
+    assert len(profiler.format_report(top_k=2).splitlines()) == 3
+
+
+def test_shutdown_logs_profiling_report(
+    mock_flagsmith_client: MagicMock,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    # Given
+    key = "key"
+    provider = FlagsmithProvider(
+        mock_flagsmith_client, profiler=EvaluationProfiler(sample_rate=1)
+    )
+
+    mock_flagsmith_client.get_environment_flags.return_value = Flags(
+        {key: Flag(feature_id=1, feature_name=key, enabled=True, value=True)}
+    )
+    provider.resolve_boolean_details(key, default_value=False)
+
+    # When
+    with caplog.at_level(logging.INFO, logger="openfeature_flagsmith.provider"):
+        provider.shutdown()
+
+    # Then
+    (record,) = caplog.records
+    assert "Flag evaluation profile" in record.getMessage()
+    assert key in record.getMessage()
+
+
+def test_profiling_is_disabled_by_default(mock_flagsmith_client: MagicMock) -> None:
+    assert FlagsmithProvider(mock_flagsmith_client).profiler is None
@@ -1,3 +1,4 @@
+import threading
 from unittest.mock import MagicMock
 
 import pytest
@@ -453,6 +454,85 @@ def test_resolve_boolean_details_uses_enabled_when_use_boolean_config_value_is_f
     assert result.reason is None
 
 
+def test_reconfigure_applies_all_changes(mock_flagsmith_client: MagicMock) -> None:
+    # Given
+    provider = FlagsmithProvider(mock_flagsmith_client)
+
+    # When
+    provider.reconfigure(
+        use_boolean_config_value=True, return_value_for_disabled_flags=True
+    )
+
+    # Then
+    assert provider.use_boolean_config_value is True
+    assert provider.return_value_for_disabled_flags is True
+    assert provider.use_flagsmith_defaults is False
+
+
+def test_setting_attribute_replaces_configuration(
+    mock_flagsmith_client: MagicMock,
+) -> None:
+    # Given
+    key = "my_feature"
+    provider = FlagsmithProvider(mock_flagsmith_client)
+
+    mock_flagsmith_client.get_environment_flags.return_value = Flags(
+        {key: DefaultFlag(enabled=True, value="foo")}
+    )
+
+    # When
+    provider.use_flagsmith_defaults = True
+    result = provider.resolve_string_details(key, default_value="default")
+
+    # Then
+    assert result.value == "foo"
+
+
+def test_concurrent_resolution_never_observes_partial_reconfiguration(
+    mock_flagsmith_client: MagicMock,
+) -> None:
+    # Given - a disabled flag whose value is a boolean. Evaluating it only
+    # fails if use_boolean_config_value is set without
+    # return_value_for_disabled_flags, which never happens atomically below.
+    key = "my_feature"
+    provider = FlagsmithProvider(mock_flagsmith_client)
+
+    mock_flagsmith_client.get_environment_flags.return_value = Flags(
+        {key: Flag(feature_id=1, feature_name=key, enabled=False, value=True)}
+    )
+
+    stop = threading.Event()
+    errors = []
+
+    def reader() -> None:
+        while not stop.is_set():
+            try:
+                provider.resolve_boolean_details(key, default_value=False)
+            except Exception as e:  # pragma: no cover
+                errors.append(e)
+                return
+
+    def writer() -> None:
+        for i in range(2000):
+            provider.reconfigure(
+                use_boolean_config_value=bool(i % 2),
+                return_value_for_disabled_flags=bool(i % 2),
+            )
+
+    readers = [threading.Thread(target=reader) for _ in range(8)]
+
+    # When
+    for thread in readers:
+        thread.start()
+    writer()
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    # Then
+    assert errors == []
+
+
 # ---------------------------------------------------------------------------
 # Tracking
 # ---------------------------------------------------------------------------
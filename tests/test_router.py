@@ -0,0 +1,352 @@
+import logging
+import threading
+import time
+import typing
+from unittest.mock import MagicMock
+
+import pytest
+from flagsmith import Flagsmith
+from flagsmith.models import Flag, Flags
+from openfeature.evaluation_context import EvaluationContext
+from openfeature.exception import ErrorCode, InvalidContextError, ProviderFatalError
+
+from openfeature_flagsmith.factory import FlagsmithProviderFactory
+from openfeature_flagsmith.router import FlagsmithRouterProvider
+
+ENVIRONMENT_KEYS = {
+    "tenant_1": "ser.key_1",
+    "tenant_2": "ser.key_2",
+    "tenant_3": "ser.key_3",
+}
+
+
+def _create_client(environment_key: str, **kwargs: typing.Any) -> MagicMock:
+    client = MagicMock(spec=Flagsmith)
+    flags = Flags(
+        {
+            "key": Flag(
+                feature_id=1, feature_name="key", enabled=True, value=environment_key
+            )
+        }
+    )
+    client.get_environment_flags.return_value = flags
+    client.get_identity_flags.return_value = flags
+    return client
+
+
+@pytest.fixture()
+def mock_factory() -> MagicMock:
+    factory = MagicMock(spec=FlagsmithProviderFactory)
+    factory.create_client.side_effect = _create_client
+    return factory
+
+
+def _context(tenant: str) -> EvaluationContext:
+    return EvaluationContext(attributes={"tenant": tenant})
+
+
+def test_evaluations_are_routed_by_tenant(mock_factory: MagicMock) -> None:
+    # Given
+    router = FlagsmithRouterProvider(ENVIRONMENT_KEYS, factory=mock_factory)
+
+    # When
+    values = [
+        router.resolve_string_details("key", "default", _context(tenant)).value
+        for tenant in ["tenant_1", "tenant_2", "tenant_1"]
+    ]
+
+    # Then - one client is created per tenant, on first use
+    assert values == ["ser.key_1", "ser.key_2", "ser.key_1"]
+    assert [c.args for c in mock_factory.create_client.call_args_list] == [
+        ("ser.key_1",),
+        ("ser.key_2",),
+    ]
+    assert router.get_metadata().name == "FlagsmithRouterProvider"
+
+
+def test_tenant_attribute_is_not_sent_as_trait(mock_factory: MagicMock) -> None:
+    # Given
+    router = FlagsmithRouterProvider(ENVIRONMENT_KEYS, factory=mock_factory)
+
+    # When
+    router.resolve_string_details(
+        "key",
+        "default",
+        EvaluationContext(
+            targeting_key="user", attributes={"tenant": "tenant_1", "foo": "bar"}
+        ),
+    )
+
+    # Then
+    client = router._environments["tenant_1"].provider.client
+    client.get_identity_flags.assert_called_once_with(
+        identifier="user", traits={"foo": "bar"}
+    )
+
+
+def test_least_recently_used_environment_is_evicted(mock_factory: MagicMock) -> None:
+    # Given
+    router = FlagsmithRouterProvider(
+        ENVIRONMENT_KEYS, factory=mock_factory, max_environments=2
+    )
+    router.resolve_string_details("key", "default", _context("tenant_1"))
+    router.resolve_string_details("key", "default", _context("tenant_2"))
+    tenant_2_client = router._environments["tenant_2"].provider.client
+    released = threading.Event()
+    releasing_threads = []
+
+    def release_client(client: MagicMock) -> None:
+        releasing_threads.append(threading.current_thread())
+        released.set()
+
+    mock_factory.release_client.side_effect = release_client
+
+    # When
+    router.resolve_string_details("key", "default", _context("tenant_1"))
+    router.resolve_string_details("key", "default", _context("tenant_3"))
+
+    # Then - the evicted client is released by a worker, not the caller
+    assert router.tenants == ["tenant_1", "tenant_3"]
+    assert released.wait(5)
+    mock_factory.release_client.assert_called_once_with(tenant_2_client)
+    assert releasing_threads[0] is not threading.current_thread()
+    router.shutdown()
+
+
+def test_idle_environments_are_evicted(mock_factory: MagicMock) -> None:
+    # Given
+    router = FlagsmithRouterProvider(
+        ENVIRONMENT_KEYS,
+        factory=mock_factory,
+        max_idle_seconds=0,
+        environment_refresh_interval_seconds=3600,
+    )
+    router.resolve_string_details("key", "default", _context("tenant_1"))
+
+    # When
+    router._run_background_tasks()
+
+    # Then
+    assert router.tenants == []
+    mock_factory.release_client.assert_called_once()
+    router.shutdown()
+
+
+def test_local_evaluation_environments_are_refreshed_by_shared_workers(
+    mock_factory: MagicMock,
+) -> None:
+    # Given
+    router = FlagsmithRouterProvider(
+        ENVIRONMENT_KEYS,
+        factory=mock_factory,
+        enable_local_evaluation=True,
+        environment_refresh_interval_seconds=3600,
+    )
+    for tenant in ["tenant_1", "tenant_2"]:
+        router.resolve_string_details("key", "default", _context(tenant))
+    clients = [router._environments[t].provider.client for t in router.tenants]
+
+    # When
+    router._run_background_tasks()
+
+    # Then - clients evaluate locally without starting their own polling threads
+    for client in clients:
+        assert client.enable_local_evaluation is True
+        assert client.update_environment.call_count == 2
+    assert all(
+        "enable_local_evaluation" not in c.kwargs
+        for c in mock_factory.create_client.call_args_list
+    )
+    router.shutdown()
+
+
+def test_local_evaluation_requires_server_key(mock_factory: MagicMock) -> None:
+    # Given
+    router = FlagsmithRouterProvider(
+        {"tenant": "client_key"},
+        factory=mock_factory,
+        enable_local_evaluation=True,
+        environment_refresh_interval_seconds=3600,
+    )
+
+    # When
+    with pytest.raises(ValueError):
+        router.resolve_string_details("key", "default", _context("tenant"))
+
+    # Then
+    mock_factory.release_client.assert_called_once()
+    router.shutdown()
+
+
+def test_missing_tenant_raises_invalid_context(mock_factory: MagicMock) -> None:
+    router = FlagsmithRouterProvider(ENVIRONMENT_KEYS, factory=mock_factory)
+
+    with pytest.raises(InvalidContextError) as e:
+        router.resolve_string_details("key", "default", EvaluationContext())
+
+    assert e.value.error_code == ErrorCode.INVALID_CONTEXT
+    assert e.value.error_message == "Evaluation context has no 'tenant' attribute."
+
+
+def test_unknown_tenant_raises_invalid_context(mock_factory: MagicMock) -> None:
+    router = FlagsmithRouterProvider(ENVIRONMENT_KEYS, factory=mock_factory)
+
+    with pytest.raises(InvalidContextError) as e:
+        router.resolve_string_details("key", "default", _context("unknown"))
+
+    assert e.value.error_message == "Unknown tenant 'unknown'."
+    mock_factory.create_client.assert_not_called()
+
+
+def test_environment_keys_can_be_resolved_by_callable(
+    mock_factory: MagicMock,
+) -> None:
+    router = FlagsmithRouterProvider(
+        lambda tenant: f"ser.{tenant}", factory=mock_factory
+    )
+
+    result = router.resolve_string_details("key", "default", _context("acme"))
+
+    assert result.value == "ser.acme"
+
+
+def test_shutdown_releases_all_environments(mock_factory: MagicMock) -> None:
+    # Given
+    router = FlagsmithRouterProvider(ENVIRONMENT_KEYS, factory=mock_factory)
+    router.resolve_string_details("key", "default", _context("tenant_1"))
+    router.resolve_string_details("key", "default", _context("tenant_2"))
+
+    # When
+    router.shutdown()
+
+    # Then
+    assert router.tenants == []
+    assert mock_factory.release_client.call_count == 2
+    mock_factory.close.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "evaluation_context", [None, EvaluationContext(), _context("unknown")]
+)
+def test_track_without_known_tenant_is_ignored(
+    mock_factory: MagicMock,
+    evaluation_context: typing.Optional[EvaluationContext],
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    # Given
+    router = FlagsmithRouterProvider(ENVIRONMENT_KEYS, factory=mock_factory)
+
+    # When
+    with caplog.at_level(logging.DEBUG, logger="openfeature_flagsmith.router"):
+        router.track("event", evaluation_context)
+
+    # Then
+    mock_factory.create_client.assert_not_called()
+    (record,) = caplog.records
+    assert record.getMessage().startswith("Not tracking event 'event'")
+
+
+def test_track_is_routed_by_tenant(mock_factory: MagicMock) -> None:
+    # Given
+    router = FlagsmithRouterProvider(ENVIRONMENT_KEYS, factory=mock_factory)
+
+    # When
+    router.track(
+        "event",
+        EvaluationContext(
+            targeting_key="user", attributes={"tenant": "tenant_1", "foo": "bar"}
+        ),
+    )
+
+    # Then
+    client = router._environments["tenant_1"].provider.client
+    client.track_event.assert_called_once()
+    assert client.track_event.call_args.kwargs["traits"] == {"foo": "bar"}
+
+
+def test_concurrent_first_use_creates_one_client(mock_factory: MagicMock) -> None:
+    # Given - creating a client takes a while, e.g. to fetch its environment
+    def create_client(environment_key: str, **kwargs: typing.Any) -> MagicMock:
+        time.sleep(0.05)
+        return _create_client(environment_key, **kwargs)
+
+    mock_factory.create_client.side_effect = create_client
+    router = FlagsmithRouterProvider(ENVIRONMENT_KEYS, factory=mock_factory)
+    values = []
+
+    def resolve() -> None:
+        values.append(
+            router.resolve_string_details("key", "default", _context("tenant_1")).value
+        )
+
+    threads = [threading.Thread(target=resolve) for _ in range(8)]
+
+    # When
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Then
+    assert values == ["ser.key_1"] * 8
+    mock_factory.create_client.assert_called_once_with("ser.key_1")
+    mock_factory.release_client.assert_not_called()
+
+
+def test_failed_client_creation_is_retried(mock_factory: MagicMock) -> None:
+    # Given
+    mock_factory.create_client.side_effect = iter(
+        [RuntimeError("boom"), _create_client("ser.key_1")]
+    )
+    router = FlagsmithRouterProvider(ENVIRONMENT_KEYS, factory=mock_factory)
+
+    # When
+    with pytest.raises(RuntimeError):
+        router.resolve_string_details("key", "default", _context("tenant_1"))
+    result = router.resolve_string_details("key", "default", _context("tenant_1"))
+
+    # Then
+    assert result.value == "ser.key_1"
+    assert mock_factory.create_client.call_count == 2
+    assert router.tenants == ["tenant_1"]
+
+
+def test_shutdown_stops_background_worker(mock_factory: MagicMock) -> None:
+    # Given
+    router = FlagsmithRouterProvider(
+        ENVIRONMENT_KEYS,
+        factory=mock_factory,
+        enable_local_evaluation=True,
+        environment_refresh_interval_seconds=0.01,
+    )
+    router.resolve_string_details("key", "default", _context("tenant_1"))
+    client = router._environments["tenant_1"].provider.client
+
+    # When
+    router.shutdown()
+    update_count = client.update_environment.call_count
+    router._run_background_tasks()
+
+    # Then
+    assert router._worker is not None
+    assert not router._worker.is_alive()
+    assert client.update_environment.call_count == update_count
+
+
+def test_evaluations_after_shutdown_do_not_create_clients(
+    mock_factory: MagicMock,
+) -> None:
+    # Given
+    router = FlagsmithRouterProvider(ENVIRONMENT_KEYS, factory=mock_factory)
+    router.resolve_string_details("key", "default", _context("tenant_1"))
+    router.shutdown()
+
+    # When
+    with pytest.raises(ProviderFatalError) as e:
+        router.resolve_string_details("key", "default", _context("tenant_2"))
+    router.track("event", _context("tenant_2"))
+
+    # Then
+    assert e.value.error_code == ErrorCode.PROVIDER_FATAL
+    mock_factory.create_client.assert_called_once_with("ser.key_1")
+    assert router.tenants == []
@@ -0,0 +1,281 @@
+import base64
+import time
+import zlib
+from unittest.mock import MagicMock
+
+import pytest
+from flagsmith import Flagsmith
+from flagsmith.models import Flag, Flags
+from openfeature.evaluation_context import EvaluationContext
+from openfeature.exception import ErrorCode
+
+from openfeature_flagsmith.exceptions import FlagsmithTokenError
+from openfeature_flagsmith.profiling import SOURCE_TOKEN, EvaluationProfiler
+from openfeature_flagsmith.provider import FlagsmithProvider
+from openfeature_flagsmith import snapshot
+from openfeature_flagsmith.snapshot import (
+    MAX_PAYLOAD_SIZE,
+    TOKEN_VERSION,
+    decode_flags_token,
+    encode_flags_token,
+)
+
+SIGNING_KEY = b"secret"
+
+
+@pytest.fixture()
+def flags() -> Flags:
+    return Flags(
+        {
+            "string_flag": Flag(
+                feature_id=1, feature_name="string_flag", enabled=True, value="foo"
+            ),
+            "int_flag": Flag(
+                feature_id=2, feature_name="int_flag", enabled=False, value=12
+            ),
+            "object_flag": Flag(
+                feature_id=3,
+                feature_name="object_flag",
+                enabled=True,
+                value='{"foo": "bar"}',
+            ),
+            "none_flag": Flag(
+                feature_id=4, feature_name="none_flag", enabled=True, value=None
+            ),
+        }
+    )
+
+
+@pytest.fixture()
+def mock_flagsmith_client() -> MagicMock:
+    return MagicMock(spec=Flagsmith)
+
+
+@pytest.mark.parametrize("signing_key", [None, SIGNING_KEY])
+def test_flags_token_round_trip(flags: Flags, signing_key: bytes) -> None:
+    # When
+    token = encode_flags_token("user", flags, signing_key=signing_key)
+    decoded = decode_flags_token(token, signing_key=signing_key)
+
+    # Then
+    assert decoded.identifier == "user"
+    assert decoded.flags.all_flags() == flags.all_flags()
+    assert abs(decoded.issued_at - time.time()) < 5
+
+
+def test_flags_token_is_header_safe_and_compact() -> None:
+    # Given
+    flags = Flags(
+        {
+            f"feature_{i}": Flag(
+                feature_id=i, feature_name=f"feature_{i}", enabled=True, value=i
+            )
+            for i in range(50)
+        }
+    )
+
+    # When
+    token = encode_flags_token("user", flags, signing_key=SIGNING_KEY)
+
+    # Then
+    assert token.isascii()
+    assert not set(token) - set(
+        "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_"
+    )
+    assert len(token) < 1024
+
+
+def test_decode_flags_token_rejects_tampered_token(flags: Flags) -> None:
+    # Given
+    data = bytearray(
+        base64.urlsafe_b64decode(
+            encode_flags_token("user", flags, signing_key=SIGNING_KEY) + "=="
+        )
+    )
+    data[5] ^= 0xFF
+    token = base64.urlsafe_b64encode(bytes(data)).decode()
+
+    # When
+    with pytest.raises(FlagsmithTokenError) as e:
+        decode_flags_token(token, signing_key=SIGNING_KEY)
+
+    # Then
+    assert e.value.error_code == ErrorCode.GENERAL
+    assert e.value.error_message == "Flags token signature is invalid."
+
+
+def test_decode_flags_token_rejects_wrong_key(flags: Flags) -> None:
+    token = encode_flags_token("user", flags, signing_key=SIGNING_KEY)
+
+    with pytest.raises(FlagsmithTokenError):
+        decode_flags_token(token, signing_key=b"other")
+
+
+def test_decode_flags_token_requires_signature_when_key_given(flags: Flags) -> None:
+    token = encode_flags_token("user", flags)
+
+    with pytest.raises(FlagsmithTokenError) as e:
+        decode_flags_token(token, signing_key=SIGNING_KEY)
+
+    assert e.value.error_message == "Flags token is not signed."
+
+
+def test_decode_flags_token_rejects_unsupported_version(flags: Flags) -> None:
+    data = bytearray(base64.urlsafe_b64decode(encode_flags_token("user", flags) + "=="))
+    data[0] = 99
+    token = base64.urlsafe_b64encode(bytes(data)).decode()
+
+    with pytest.raises(FlagsmithTokenError) as e:
+        decode_flags_token(token)
+
+    assert e.value.error_message == "Unsupported flags token version 99."
+
+
+@pytest.mark.parametrize("token", ["", "!!!", "AQA", "AQBub3QgemxpYg"])
+def test_decode_flags_token_rejects_malformed_token(token: str) -> None:
+    with pytest.raises(FlagsmithTokenError):
+        decode_flags_token(token)
+
+
+def test_decode_flags_token_rejects_oversized_payload() -> None:
+    # Given - a small token that decompresses beyond the payload limit
+    payload = b'["user",[' + b" " * (MAX_PAYLOAD_SIZE * 4) + b"]]"
+    data = bytes((TOKEN_VERSION, 0)) + zlib.compress(payload, 9)
+    token = base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+    assert len(token) < 8 * 1024
+
+    # When
+    with pytest.raises(FlagsmithTokenError) as e:
+        decode_flags_token(token)
+
+    # Then
+    assert e.value.error_message == "Flags token payload is malformed."
+
+
+def test_decode_flags_token_rejects_expired_token(
+    flags: Flags, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Given - a token issued two minutes ago
+    issued_at = int(time.time()) - 120
+    monkeypatch.setattr(snapshot.time, "time", lambda: issued_at)
+    token = encode_flags_token("user", flags, signing_key=SIGNING_KEY)
+    monkeypatch.undo()
+
+    # When
+    with pytest.raises(FlagsmithTokenError) as e:
+        decode_flags_token(token, signing_key=SIGNING_KEY, max_age_seconds=60)
+
+    # Then
+    assert e.value.error_message == "Flags token has expired."
+    assert decode_flags_token(token, signing_key=SIGNING_KEY).issued_at == issued_at
+
+
+def test_imported_flags_token_is_used_instead_of_fetching(
+    mock_flagsmith_client: MagicMock, flags: Flags
+) -> None:
+    # Given
+    edge_client = MagicMock(spec=Flagsmith)
+    edge_client.get_identity_flags.return_value = flags
+    edge_provider = FlagsmithProvider(edge_client, token_signing_key=SIGNING_KEY)
+
+    profiler = EvaluationProfiler(sample_rate=1)
+    provider = FlagsmithProvider(
+        mock_flagsmith_client, token_signing_key=SIGNING_KEY, profiler=profiler
+    )
+    context = EvaluationContext(targeting_key="user", attributes={"foo": "bar"})
+
+    token = edge_provider.export_flags_token(context)
+
+    # When
+    with provider.use_flags_token(token):
+        string_result = provider.resolve_string_details(
+            "string_flag", default_value="default", evaluation_context=context
+        )
+        object_result = provider.resolve_object_details(
+            "object_flag", default_value={}, evaluation_context=context
+        )
+
+    # Then
+    assert string_result.value == "foo"
+    assert object_result.value == {"foo": "bar"}
+    mock_flagsmith_client.get_identity_flags.assert_not_called()
+    assert profiler.report(top_k=1)[0].sources == {SOURCE_TOKEN: 1}
+
+
+def test_imported_flags_token_is_ignored_for_other_identities(
+    mock_flagsmith_client: MagicMock, flags: Flags
+) -> None:
+    # Given
+    provider = FlagsmithProvider(mock_flagsmith_client)
+    mock_flagsmith_client.get_identity_flags.return_value = Flags(
+        {
+            "string_flag": Flag(
+                feature_id=1, feature_name="string_flag", enabled=True, value="bar"
+            )
+        }
+    )
+    token = encode_flags_token("user", flags)
+
+    # When
+    with provider.use_flags_token(token):
+        result = provider.resolve_string_details(
+            "string_flag",
+            default_value="default",
+            evaluation_context=EvaluationContext(targeting_key="other_user"),
+        )
+
+    # Then
+    assert result.value == "bar"
+    mock_flagsmith_client.get_identity_flags.assert_called_once()
+
+
+def test_imported_flags_token_is_scoped_to_block(
+    mock_flagsmith_client: MagicMock, flags: Flags
+) -> None:
+    # Given
+    provider = FlagsmithProvider(mock_flagsmith_client)
+    mock_flagsmith_client.get_environment_flags.return_value = Flags(
+        {
+            "string_flag": Flag(
+                feature_id=1, feature_name="string_flag", enabled=True, value="bar"
+            )
+        }
+    )
+
+    # When
+    with provider.use_flags_token(encode_flags_token(None, flags)):
+        pass
+    result = provider.resolve_string_details("string_flag", default_value="default")
+
+    # Then
+    assert result.value == "bar"
+
+
+def test_use_flags_token_rejects_unsigned_token_when_key_configured(
+    mock_flagsmith_client: MagicMock, flags: Flags
+) -> None:
+    provider = FlagsmithProvider(mock_flagsmith_client, token_signing_key=SIGNING_KEY)
+
+    with pytest.raises(FlagsmithTokenError):
+        with provider.use_flags_token(encode_flags_token("user", flags)):
+            pass
+
+
+def test_use_flags_token_rejects_token_older_than_max_age(
+    mock_flagsmith_client: MagicMock, flags: Flags, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Given
+    provider = FlagsmithProvider(
+        mock_flagsmith_client, token_signing_key=SIGNING_KEY, token_max_age_seconds=5
+    )
+    token = encode_flags_token("user", flags, signing_key=SIGNING_KEY)
+
+    # When - the token is used ten seconds after it was issued
+    now = time.time() + 10
+    monkeypatch.setattr(snapshot.time, "time", lambda: now)
+    with pytest.raises(FlagsmithTokenError) as e:
+        with provider.use_flags_token(token):
+            pass
+
+    # Then
+    assert e.value.error_message == "Flags token has expired."